@@ -1,6 +1,28 @@
 import pandas as pd
 import numpy as np
 
+
+def _on_uniques(s: pd.Series, func) -> pd.Series:
+    '''
+        Runs func (Series -> Series of labels) on the distinct values of s only and spreads the result back.
+        compounds / tyre ages have a handful of values, so this avoids a python call per lap.
+        missing values go through func as they are, None and NaN can give different labels
+    '''
+    
+    if len(s) == 0:
+        return func(s)
+    
+    na = s.isna().to_numpy()
+    codes, uniques = pd.factorize(s[~na])
+    
+    out = np.empty(len(s), dtype=object)
+    out[~na] = np.asarray(func(pd.Series(uniques)), dtype=object)[codes]
+    if na.any():
+        out[na] = np.asarray(func(s[na]), dtype=object)
+        
+    return pd.Series(out, index=s.index, name=s.name)
+
+
 def add_lap_features(df: pd.DataFrame) -> pd.DataFrame:
     '''
         Adds basic lap features
@@ -82,7 +104,7 @@ def add_tyre_features(df : pd.DataFrame) -> pd.DataFrame:
         return 'degradation'
     
 
-    df_add.loc[:,'stint_phase'] = df_add['tyre_age'].apply(stint_phase)
+    df_add.loc[:,'stint_phase'] = _on_uniques(df_add['tyre_age'], lambda a: a.apply(stint_phase))
     
     if 'lap_time_best_on_tyre' in df.columns:
         df_add['lap_time_best_on_tyre'] = df_add['lap_time_best_on_tyre'].astype('bool')
@@ -146,7 +168,7 @@ def add_compound_features( df: pd.DataFrame) -> pd.DataFrame:
     if 'compound' not in df_add.columns:
         df_add['compound'] = ''
     
-    df_add['compound'] = df_add['compound'].astype(str).str.strip().str.lower()
+    df_add['compound'] = _on_uniques(df_add['compound'], lambda c: c.astype(str).str.strip().str.lower())
     
     def normalize_comp(c):
         if 'soft' in c:
@@ -157,7 +179,7 @@ def add_compound_features( df: pd.DataFrame) -> pd.DataFrame:
             return 'hard'
         return 'other'
     
-    df_add['compound_cat'] =  df_add['compound'].apply(normalize_comp)
+    df_add['compound_cat'] =  _on_uniques(df_add['compound'], lambda c: c.apply(normalize_comp))
     
     ## one hot
     
@@ -222,4 +244,27 @@ def finalize_feature_matrix(df: pd.DataFrame, drop_cols = None) -> pd.DataFrame:
         cols = [c for c in final_df.columns if c!='lap_time'] + ['lap_time']
         final_df = final_df[cols]
         
-    return final_df
\ No newline at end of file
+    return final_df
+
+
+FEATURE_STEPS = [
+    add_lap_features,
+    add_telemetry_features,
+    add_tyre_features,
+    add_driver_features,
+    add_compound_features,
+    finalize_feature_matrix,
+]
+
+
+def build_features(df: pd.DataFrame, steps = None) -> pd.DataFrame:
+    '''
+        Runs the feature steps one after another
+    '''
+
+    steps = FEATURE_STEPS if steps is None else steps
+
+    for step in steps:
+        df = step(df)
+
+    return df
@@ -0,0 +1,62 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import build_features
+
+
+def _synthetic_laps(seasons = 2, races = 6, drivers = 5, seed = 0):
+    '''
+        Shuffled multi season lap frame shaped like the clean csvs. compound holds both None
+        (what extract_rows_from_session leaves in memory) and NaN (what read_csv gives)
+    '''
+
+    rng = np.random.default_rng(seed)
+    compounds = ['Soft', 'Medium', 'Hard', 'Intermediate', None, np.nan]
+    names = [f'D{d:02d}' for d in range(drivers)]
+
+    frames = []
+    for season in range(2021, 2021 + seasons):
+        for rnd in range(1, races + 1):
+            n_laps = int(rng.integers(40, 70))
+            n = n_laps * drivers
+            frames.append(pd.DataFrame({
+                'season': season,
+                'round': rnd,
+                'driver_name': np.repeat(names, n_laps),
+                'lap_number': np.tile(np.arange(1, n_laps + 1, dtype=float), drivers),
+                'lap_time': np.where(rng.random(n) > 0.05, rng.normal(90, 2, n), np.nan),
+                'compound': rng.choice(np.array(compounds, dtype=object), n, p=[0.3, 0.3, 0.2, 0.1, 0.05, 0.05]),
+                'tyre_age': rng.integers(1, 30, n).astype(float),
+                'avg_speed': rng.normal(200, 5, n),
+                'avg_throttle': rng.normal(60, 5, n),
+                'avg_brake': rng.random(n),
+                'gap_to_leader': None,
+                'circuit_name': f'circuit_{rnd}',
+                'lap_time_best_on_tyre': rng.random(n) > 0.9,
+            }))
+
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=seed)
+
+
+df = _synthetic_laps()
+
+## same frame as held in memory (None in compound) and after a csv round trip (NaN)
+for label, frame in [('in memory', df), ('csv', pd.read_csv(io.StringIO(df.to_csv(index=False))))]:
+    out = build_features(frame)
+    assert len(out) == len(frame)
+    assert out['lap_time'].notna().all()
+    print(f'{label}: {len(out)} rows, {out.shape[1]} columns')
+
+## timing, 5 seasons x 22 races x 20 drivers, best of 5
+df = _synthetic_laps(seasons=5, races=22, drivers=20)
+
+runs = []
+for _ in range(5):
+    t = time.perf_counter()
+    build_features(df)
+    runs.append(time.perf_counter() - t)
+
+print(f'{len(df)} rows : {min(runs):.2f}s')
@@ -12,6 +12,94 @@ def load_session(season, gp, session_name = 'Race', telemetry = True, weather =
     
     
     
+'''
+    Lap level fields (timing, tyres, weather and telemetry aggregates) for one lap, no session / driver metadata
+'''
+
+def extract_lap_metrics(lap, idx):
+
+    row = {}
+
+    row['lap_number'] = lap.LapNumber
+    row['lap_time'] = lap.LapTime.total_seconds() if pd.notna(lap.LapTime) else None
+
+    row['sector1_time'] = lap.Sector1Time.total_seconds() if pd.notna(lap.Sector1Time) else None
+    row['sector2_time'] = lap.Sector2Time.total_seconds() if pd.notna(lap.Sector2Time) else None
+    row['sector3_time'] = lap.Sector3Time.total_seconds() if pd.notna(lap.Sector3Time) else None
+
+    row['is_outlap'] = pd.notna(lap.PitOutTime)
+    row['is_inlap'] = pd.notna(lap.PitInTime)
+    
+    row['position'] = lap.Position
+    row['gap_to_leader'] = None
+    row['speed_trap'] = lap.SpeedST if pd.notna(lap.SpeedST) else lap.SpeedI2
+
+    row['compound'] = lap.Compound
+    row['tyre_age'] = lap.TyreLife
+    row['stint_number'] = lap.Stint
+
+    try:
+        w = lap.get_weather_data()
+        if w is not None:
+            row['air_temp'] = float(w.get('AirTemp', None))
+            row['track_temp'] = float(w.get('TrackTemp', None))
+            row['humidity'] = float(w.get('Humidity', None))
+            row['pressure'] = float(w.get('Pressure', None))
+            row['rainfall'] = bool(w.get('Rainfall', False))
+            
+            row['wind_speed'] = float(w.get('WindSpeed', None))
+            row['wind_direction'] = float(w.get('WindDirection', None))
+            row['has_weather'] = True
+    except:
+        row['air_temp'] = row['track_temp'] = row['humidity'] = None
+        row['pressure'] = row['wind_speed'] = row['wind_direction'] = None
+        row['rainfall'] = False
+        row['has_weather'] = False
+    
+    
+    
+    try:
+        tel = lap.get_telemetry()
+        
+        if tel is not None:
+            row['has_telemetry'] = True
+        
+        row['avg_speed'] = tel['Speed'].mean() if 'Speed' in tel.columns else None
+        row['max_speed'] = tel['Speed'].max() if 'Speed' in tel.columns else None
+
+        row['avg_throttle'] = tel['Throttle'].mean() if 'Throttle' in tel.columns else None
+        row['std_throttle'] = tel['Throttle'].std() if 'Throttle' in tel.columns else None
+
+        row['avg_brake'] = tel['Brake'].mean() if 'Brake' in tel.columns else None
+        row['std_brake'] = tel['Brake'].std() if 'Brake' in tel.columns else None
+
+        row['max_rpm'] = tel['RPM'].max() if 'RPM' in tel.columns else None
+
+        row['avg_gear'] = tel['nGear'].mean() if 'nGear' in tel.columns else None
+        del tel
+
+    except Exception as e:
+        
+        print(f'Telemetry error for lap idx {idx} (driver {lap.Driver}): {e}')
+        
+        row['has_telemetry'] = False
+        row['avg_speed'] = None  
+        row['max_speed'] = None 
+
+        row['avg_throttle'] = None
+        row['std_throttle'] = None
+
+        row['avg_brake'] = None
+        row['std_brake'] = None
+
+        row['max_rpm'] = None
+
+        row['avg_gear'] = None
+
+    return row
+
+
+
 '''
     Extracts rows from given season and gp, includes metadata , telemetry and details per lap
 '''    
@@ -24,7 +112,7 @@ def extract_rows_from_session(session, season ,gp):
     meta['gp'] = gp
     meta['race_name'] = session.event.get('EventName', session.event.get('Event'))
     meta['race_date'] = session.event.get('EventDate', None)
-    meta['session'] = 'Race'
+    meta['session'] = session.name
     meta['circuit_name'] = getattr(session,'track_name',None) or session.event.get('Circuit', None)
     meta['laps_total_in_race'] = int(session.laps['LapNumber'].max())
 
@@ -44,85 +132,125 @@ def extract_rows_from_session(session, season ,gp):
         row['driver_number'] = lap.DriverNumber
         row['team'] = lap.Team
         
-        row['lap_number'] = lap.LapNumber
-        row['lap_time'] = lap.LapTime.total_seconds() if pd.notna(lap.LapTime) else None
+        row.update(extract_lap_metrics(lap, idx))
+        row.update(meta)
+        rows.append(row) 
+    
+    df_raw = pd.DataFrame(rows)
+    return rows, df_raw
+        
 
-        row['sector1_time'] = lap.Sector1Time.total_seconds() if pd.notna(lap.Sector1Time) else None
-        row['sector2_time'] = lap.Sector2Time.total_seconds() if pd.notna(lap.Sector2Time) else None
-        row['sector3_time'] = lap.Sector3Time.total_seconds() if pd.notna(lap.Sector3Time) else None
 
-        row['is_outlap'] = pd.notna(lap.PitOutTime)
-        row['is_inlap'] = pd.notna(lap.PitInTime)
-        
-        row['position'] = lap.Position
-        row['gap_to_leader'] = None
-        row['speed_trap'] = lap.SpeedST if pd.notna(lap.SpeedST) else lap.SpeedI2
+SESSION_NAMES = ['Practice 1', 'Practice 2', 'Practice 3', 'Sprint Shootout', 'Sprint Qualifying', 'Sprint', 'Qualifying', 'Race']
 
-        row['compound'] = lap.Compound
-        row['tyre_age'] = lap.TyreLife
-        row['stint_number'] = lap.Stint
 
-        try:
-            w = lap.get_weather_data()
-            if w is not None:
-                row['air_temp'] = float(w.get('AirTemp', None))
-                row['track_temp'] = float(w.get('TrackTemp', None))
-                row['humidity'] = float(w.get('Humidity', None))
-                row['pressure'] = float(w.get('Pressure', None))
-                row['rainfall'] = bool(w.get('Rainfall', False))
-                
-                row['wind_speed'] = float(w.get('WindSpeed', None))
-                row['wind_direction'] = float(w.get('WindDirection', None))
-                row['has_weather'] = True
-        except:
-            row['air_temp'] = row['track_temp'] = row['humidity'] = None
-            row['pressure'] = row['wind_speed'] = row['wind_direction'] = None
-            row['rainfall'] = False
-            row['has_weather'] = False
-        
+'''
+    Splits an event into dimension tables and a lap fact table joined on compact integer keys
+    
+    - events   : one row, event_id = season * 100 + round
+    - sessions : one row per session, session_id = event_id * 10 + session_number
+    - drivers  : one row per driver in the event, driver_id = event_id * 100 + running number
+    - laps     : lap metrics only, plus session_id and driver_id
+    
+    event is a fastf1 Event (fastf1.get_event or the season schedule), session_number is its Session1..5 slot.
+    sessions are loaded, extracted and released one at a time so only one session's telemetry is held in memory.
+    ids are built from season and the event's RoundNumber so tables from different events can be concatenated without clashes.
+    returns (tables, {session_name : error}) for sessions that failed to load, failed to extract or have no laps, those are left out
+'''
+def extract_event_tables(event, season, session_names = None, telemetry = True, weather = True):
+    
+    gp = int(event['RoundNumber'])
+    event_id = season * 100 + gp
+    wanted = SESSION_NAMES if session_names is None else session_names
+    
+    session_rows = []
+    driver_info = {}
+    lap_rows = []
+    errors = {}
+    circuit_name = None
+    
+    for n in range(1, 6):
+        name = event.get(f'Session{n}', None)
+        if not name or name not in wanted:
+            continue
         
+        ## built on the side so a session that fails halfway leaves nothing behind
+        session_id = event_id * 10 + n
+        session_laps = []
+        session_drivers = {}
         
         try:
-            tel = lap.get_telemetry()
+            session = event.get_session(name)
+            session.load(telemetry = telemetry, weather = weather)
             
-            if tel is not None:
-                row['has_telemetry'] = True
+            if len(session.laps) == 0:
+                raise ValueError('no laps')
             
-            row['avg_speed'] = tel['Speed'].mean() if 'Speed' in tel.columns else None
-            row['max_speed'] = tel['Speed'].max() if 'Speed' in tel.columns else None
-
-            row['avg_throttle'] = tel['Throttle'].mean() if 'Throttle' in tel.columns else None
-            row['std_throttle'] = tel['Throttle'].std() if 'Throttle' in tel.columns else None
-
-            row['avg_brake'] = tel['Brake'].mean() if 'Brake' in tel.columns else None
-            row['std_brake'] = tel['Brake'].std() if 'Brake' in tel.columns else None
-
-            row['max_rpm'] = tel['RPM'].max() if 'RPM' in tel.columns else None
-
-            row['avg_gear'] = tel['nGear'].mean() if 'nGear' in tel.columns else None
-            del tel
-
-        except Exception as e:
+            session_row = {
+                'session_id' : session_id,
+                'event_id' : event_id,
+                'session_number' : n,
+                'session' : session.name,
+                'session_date' : getattr(session, 'date', None),
+                'laps_total' : int(session.laps['LapNumber'].max()),
+            }
+            
+            for idx in session.laps.index:
+                
+                lap = session.laps.loc[idx]
+                
+                if lap.Driver not in session_drivers:
+                    session_drivers[lap.Driver] = {'driver_number' : lap.DriverNumber, 'team' : lap.Team}
+                
+                row = {'session_id' : session_id, 'driver_name' : lap.Driver}
+                row.update(extract_lap_metrics(lap, idx))
+                session_laps.append(row)
             
-            print(f'Telemetry error for lap idx {idx} (driver {lap.Driver}): {e}')
+            circuit_name = circuit_name or getattr(session, 'track_name', None)
+                
+        except Exception as e:
+            print(f'Failed to load {name} for season {season} round {gp}: {e}')
+            errors[name] = str(e)
+            continue
+        
+        finally:
+            ## drop the loaded session (laps, telemetry, and the lap rows pointing back to it) before the next one is loaded
+            session = lap = None
+        
+        session_rows.append(session_row)
+        lap_rows.extend(session_laps)
+        for d, info in session_drivers.items():
+            driver_info.setdefault(d, info)
             
-            row['has_telemetry'] = False
-            row['avg_speed'] = None  
-            row['max_speed'] = None 
-
-            row['avg_throttle'] = None
-            row['std_throttle'] = None
-
-            row['avg_brake'] = None
-            row['std_brake'] = None
-
-            row['max_rpm'] = None
-
-            row['avg_gear'] = None
+    if not session_rows:
+        raise ValueError(f'No session of season {season} round {gp} could be extracted: {errors}')
+    
+    events = pd.DataFrame([{
+        'event_id' : event_id,
+        'season' : season,
+        'round' : gp,
+        'race_name' : event.get('EventName', event.get('Event')),
+        'race_date' : event.get('EventDate', None),
+        'circuit_name' : circuit_name or event.get('Circuit', None),
+    }])
             
-        row.update(meta)
-        rows.append(row) 
+    ## drivers numbered in name order so the ids are stable between runs
+    driver_ids = {d : event_id * 100 + i for i, d in enumerate(sorted(driver_info), start = 1)}
     
-    df_raw = pd.DataFrame(rows)
-    return rows, df_raw
-        
\ No newline at end of file
+    drivers = pd.DataFrame([
+        {'driver_id' : driver_ids[d], 'event_id' : event_id, 'driver_name' : d, **driver_info[d]}
+        for d in sorted(driver_info)
+    ])
+    
+    ## every kept session has laps, so session_id / driver_id are always there
+    laps = pd.DataFrame(lap_rows)
+    laps.insert(1, 'driver_id', laps.pop('driver_name').map(driver_ids))
+    laps[['session_id', 'driver_id']] = laps[['session_id', 'driver_id']].astype('int32')
+    
+    tables = {
+        'events' : events,
+        'sessions' : pd.DataFrame(session_rows),
+        'drivers' : drivers,
+        'laps' : laps,
+    }
+    return tables, errors
@@ -40,3 +40,28 @@ def save_clean(df_work, season , gp, root='data'):
         json.dump(records,f,indent=2, default=str)
 
     return path_csv, path_json
+
+
+
+def save_tables(tables, season, gp, stage='raw', root='data'):
+    '''
+        Saves the dimension / fact tables of one event, one csv per table and one json holding all of them
+    '''
+    
+    root = os.path.join(root, stage)
+    os.makedirs(root, exist_ok=True)
+    
+    paths = {}
+    for name, df in tables.items():
+        path = os.path.join(root, f'season_{season}_round_{gp}_{name}_{stage}.csv')
+        df.to_csv(path, index=False)
+        paths[name] = path
+        
+    path_json = os.path.join(root, f'season_{season}_round_{gp}_{stage}.json')
+    records = {name : df.to_dict(orient='records') for name, df in tables.items()}
+    
+    with open(path_json, 'w', encoding='utf8') as f:
+        json.dump(records, f, indent=2, default=str)
+        
+    paths['json'] = path_json
+    return paths
@@ -6,9 +6,9 @@ import pandas as pd
 import json
 import config
 
-from ingestion import load_session, extract_rows_from_session
-from transform import compute_derived, normalise
-from persistence import save_clean, save_raw_csv, save_raw_json
+from ingestion import load_session, extract_rows_from_session, extract_event_tables
+from transform import compute_derived, normalise, join_dimensions
+from persistence import save_clean, save_raw_csv, save_raw_json, save_tables
 
 def process_round(season, gp):
     
@@ -60,6 +60,84 @@ def process_round(season, gp):
     
     return report
 
+def process_event(season, gp, event = None, session_names = None):
+    '''
+        One pass over all sessions of an event (FP1-3, qualifying, sprint, race), saved as
+        events / sessions / drivers dimension tables plus a laps fact table
+    '''
+    
+    start_time = time.time()
+    print(f'   -> Starting event {gp} at time {time.strftime("%H:%M:%S")}')
+    
+    project_root = r'C:\Users\ASUS\Desktop\F1 Predictions & Visualizations\F1-ML-Project'
+    root = os.path.join(project_root, 'data')
+    
+    ## gp can be an event name, from here on it is the resolved round number
+    if event is None:
+        event = fastf1.get_event(season, gp)
+    gp = int(event['RoundNumber'])
+    
+    ## sessions are loaded one at a time, a session that fails is logged and left out, the rest of the event still goes through
+    tables, errors = extract_event_tables(event, season, session_names = session_names)
+    save_tables(tables, season, gp, 'raw', root)
+    
+    ## derived columns are per session, driver_id only identifies a driver within the event
+    names = dict(zip(tables['sessions']['session_id'], tables['sessions']['session']))
+    laps_clean = []
+    for session_id, g in tables['laps'].groupby('session_id', sort=True):
+        g = normalise(compute_derived(g, driver_col = 'driver_id'))
+        
+        ##------------------------------------------------------------------
+        try:
+            assert g['driver_id'].notna().all() , "Missing Driver Id"
+            assert 'lap_time' in g.columns, 'lap time missing'
+            assert g['lap_time'].isna().mean() < 0.5, 'Too many NaN lap_times'
+        except AssertionError as e:
+            print(f'Dropping {names[session_id]} from clean data: {e}')
+            errors[names[session_id]] = str(e)
+            continue
+        ##------------------------------------------------------------------
+        
+        laps_clean.append(g)
+        
+    assert laps_clean, 'No session passed the checks'
+    
+    clean = dict(tables)
+    clean['laps'] = pd.concat(laps_clean, ignore_index=True)
+    
+    save_tables(clean, season, gp, 'clean', root)
+    
+    logs_dir = os.path.join(root,'pipeline_logs')
+    os.makedirs(logs_dir, exist_ok=True)
+    
+    if errors:
+        error_path = os.path.join(logs_dir,f'season_{season}_event_{gp}_session_errors.json')
+        with open(error_path, 'w') as f:
+            json.dump([{'round' : gp, 'session' : name, 'error' : err} for name, err in errors.items()], f, indent = 2)
+    
+    ## report
+    report = {
+        'season' : season,
+        'round': gp,
+        'sessions' : [names[i] for i in clean['laps']['session_id'].unique()],
+        'failed_sessions' : sorted(errors),
+        'rows_raw': len(tables['laps']),
+        'rows_clean' :len(clean['laps'])
+    }
+    
+    pipeline_logs_path = os.path.join(logs_dir,f'season_{season}_event_{gp}_report.json')
+    
+    with open(pipeline_logs_path, 'w', encoding='utf8') as f:
+        json.dump(report, f, indent = 2)
+    
+    elapsed_time = time.time() - start_time
+    print(f'  Finished event {gp} in {elapsed_time:.2f} seconds\n')
+    
+    with open(os.path.join(root, "pipeline_logs", "runtime_log.txt"), "a") as f:
+        f.write(f"Event {gp} ({len(tables['sessions'])} sessions) completed in {elapsed_time:.2f} seconds at {time.strftime('%H:%M:%S')}\n")
+    
+    return report
+
 def process_season(season, rounds = None):
     
     project_root = r'C:\Users\ASUS\Desktop\F1 Predictions & Visualizations\F1-ML-Project'
@@ -72,7 +150,8 @@ def process_season(season, rounds = None):
         print(f'\n========[{i}/{len(rlist)}] Processing round {gp}========')
         try:
             print('Processing..', gp)
-            process_round(season, gp)
+            ## event comes from the schedule already loaded, no extra lookup per session
+            process_event(season, gp, event = schedule.get_event_by_round(gp))
             time.sleep(1)
         except Exception as e:
             print('Failed round - ', gp, e)
@@ -85,18 +164,26 @@ def process_season(season, rounds = None):
                 continue
             
     
-    clean_files = sorted(glob.glob(os.path.join(root,'clean',f'season_{season}_round_*_clean.csv')))
-    dfs = [pd.read_csv(p) for p in clean_files]
-    
-    if dfs:
-        season_df = pd.concat(dfs, ignore_index=True)
-        os.makedirs(os.path.join(root,'features'),exist_ok=True)
-        season_df.to_csv(os.path.join(root,'features',f'season_{season}_lap_features.csv'), index = False)
+    ## season level tables, fact and dimension ids are unique across rounds so a plain concat is enough
+    tables = {}
+    for name in ['events', 'sessions', 'drivers', 'laps']:
+        clean_files = sorted(glob.glob(os.path.join(root,'clean',f'season_{season}_round_*_{name}_clean.csv')))
+        dfs = [pd.read_csv(p) for p in clean_files]
+        if dfs:
+            tables[name] = pd.concat(dfs, ignore_index=True)
+    
+    if 'laps' in tables:
+        features_dir = os.path.join(root,'features')
+        os.makedirs(features_dir,exist_ok=True)
+        
+        for name, df in tables.items():
+            df.to_csv(os.path.join(features_dir,f'season_{season}_{name}.csv'), index = False)
+        
+        ## wide race laps, same file the models read before
+        season_df = join_dimensions(tables)
+        season_df = season_df[season_df['session'] == 'Race']
+        season_df.to_csv(os.path.join(features_dir,f'season_{season}_lap_features.csv'), index = False)
         
         print('Season master saved.')
     else:
         print("No clean files found")
-    
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from ingestion import load_session
+
+
+TELEMETRY_CHANNELS = ['Speed', 'Throttle', 'Brake', 'RPM', 'nGear']
+
+
+def lttb(x, y, n_out):
+    '''
+        Largest Triangle Three Buckets downsampling, keeps the visual shape of the trace.
+        First and last points are always kept, returns indices into x / y
+    '''
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    ## bucket edges for the points between first and last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        ## average of the next bucket is the third corner of the triangle
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return idx
+
+
+def minmax_decimate(x, y, n_out):
+    '''
+        Min / max bucketing, every bucket keeps its lowest and highest point so
+        braking spikes and top speed survive. returns indices into x / y
+    '''
+
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(int)
+
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        seg = y[start:end]
+        keep.append(start + int(np.argmin(seg)))
+        keep.append(start + int(np.argmax(seg)))
+
+    return np.unique(keep)
+
+
+DECIMATORS = {
+    'minmax': minmax_decimate,
+    'lttb': lttb,
+}
+
+
+def target_points(width_px, points_per_px = 2):
+    '''
+        Number of points worth drawing for a plot width, more than ~2 per pixel is not visible
+    '''
+
+    return max(int(width_px * points_per_px), 4)
+
+
+def decimate_trace(x, y, n_out, method = 'minmax'):
+    '''
+        Decimates one trace, NaNs are dropped first. returns (x, y) numpy arrays
+    '''
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+
+    idx = DECIMATORS[method](x, y, n_out)
+    return x[idx], y[idx]
+
+
+class TelemetryTraceCache:
+    '''
+        Decimated telemetry traces, cached per (season, round, session, driver, lap, channel, resolution).
+
+        Full resolution telemetry for a lap is loaded once and all requested channels are
+        decimated from it, so comparison plots only pay for the session load the first time.
+        method and x_col are fixed per cache (cached traces depend on them), use another cache to change them
+    '''
+
+    def __init__(self, max_traces = 512, max_laps = 8, max_sessions = 2, points_per_px = 2, method = 'minmax', x_col = 'Distance'):
+        self.max_traces = max_traces
+        self.max_laps = max_laps
+        self.max_sessions = max_sessions
+        self.points_per_px = points_per_px
+        self._method = method
+        self._x_col = x_col
+
+        self._traces = OrderedDict()
+        self._laps = OrderedDict() ## few full resolution laps, so a new plot width doesn't reload telemetry
+        self._sessions = OrderedDict() ## loaded sessions hold all telemetry of a race, keep only the last few
+
+    @property
+    def method(self):
+        return self._method
+
+    @property
+    def x_col(self):
+        return self._x_col
+
+    def _session(self, season, gp, session_name):
+
+        key = (season, gp, session_name)
+        if key in self._sessions:
+            self._sessions.move_to_end(key)
+            return self._sessions[key]
+
+        session = load_session(season, gp, session_name, telemetry = True, weather = False)
+
+        self._sessions[key] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last = False)
+
+        return session
+
+    def _lap_telemetry(self, season, gp, session_name, driver, lap_number):
+
+        key = (season, gp, session_name, driver, lap_number)
+        if key in self._laps:
+            self._laps.move_to_end(key)
+            return self._laps[key]
+
+        laps = self._session(season, gp, session_name).laps
+        lap = laps[(laps['Driver'] == driver) & (laps['LapNumber'] == lap_number)]
+
+        if lap.empty:
+            raise KeyError(f'No lap {lap_number} for driver {driver} in {session_name} of season {season} round {gp}')
+
+        tel = lap.iloc[0].get_telemetry()
+        if self.x_col == 'Distance' and 'Distance' not in tel.columns:
+            tel = tel.add_distance()
+
+        self._laps[key] = tel
+        while len(self._laps) > self.max_laps:
+            self._laps.popitem(last = False)
+
+        return tel
+
+    def get_traces(self, season, gp, driver, lap_number, channels = None, width_px = 1000, session_name = 'Race'):
+        '''
+            Returns {channel : (x, y)} decimated for a plot width_px pixels wide
+        '''
+
+        channels = TELEMETRY_CHANNELS if channels is None else channels
+        resolution = target_points(width_px, self.points_per_px)
+        keys = {c: (season, gp, session_name, driver, lap_number, c, resolution) for c in channels}
+
+        ## hits are taken (and marked recent) before anything is inserted, inserts can evict old entries
+        out = {}
+        for c, k in keys.items():
+            if k in self._traces:
+                self._traces.move_to_end(k)
+                out[c] = self._traces[k]
+
+        missing = [c for c in keys if c not in out]
+        if missing:
+            tel = self._lap_telemetry(season, gp, session_name, driver, lap_number)
+            x = tel[self.x_col]
+            if pd.api.types.is_timedelta64_dtype(x):
+                x = x.dt.total_seconds()
+
+            for c in missing:
+                if c not in tel.columns:
+                    raise KeyError(f'Telemetry channel {c} not available')
+                out[c] = decimate_trace(x, tel[c].astype(float), resolution, self.method)
+                self._put(keys[c], out[c])
+
+        return {c: out[c] for c in keys}
+
+    def get_trace(self, season, gp, driver, lap_number, channel, width_px = 1000, session_name = 'Race'):
+
+        return self.get_traces(season, gp, driver, lap_number, [channel], width_px, session_name)[channel]
+
+    def _put(self, key, trace):
+
+        self._traces[key] = trace
+        self._traces.move_to_end(key)
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last = False)
+
+    def clear(self):
+        self._traces.clear()
+        self._laps.clear()
+        self._sessions.clear()
+
+
+def plot_telemetry_comparison(cache, season, gp, laps, channel = 'Speed', ax = None, session_name = 'Race'):
+    '''
+        Overlays one channel for several (driver, lap_number) pairs, decimated to the axes width
+    '''
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(12, 5))
+
+    ## axes width in pixels decides how many points are worth plotting
+    width_px = ax.get_window_extent().width
+
+    for driver, lap_number in laps:
+        x, y = cache.get_trace(season, gp, driver, lap_number, channel, width_px, session_name)
+        ax.plot(x, y, lw=1.2, label=f'{driver} lap {lap_number}')
+
+    ax.set_xlabel(cache.x_col)
+    ax.set_ylabel(channel)
+    ax.set_title(f'{channel} - season {season} round {gp} {session_name}')
+    ax.legend()
+
+    return ax
@@ -2,17 +2,17 @@ import numpy as np
 import pandas as pd
 
 
-def compute_derived(df_raw):
+def compute_derived(df_raw, driver_col = 'driver_name'):
     df_work = df_raw.copy()
     
     '''
         Calculates lap time delta
     '''
     ##--------------------------------------------------------------------------------------------------------------
-    df_work = df_work.sort_values(by=['driver_name', 'lap_number']).reset_index(drop=True)
+    df_work = df_work.sort_values(by=[driver_col, 'lap_number']).reset_index(drop=True)
     df_work['lap_time_delta'] = np.nan
 
-    for driver, g in df_work.groupby('driver_name', sort=False):
+    for driver, g in df_work.groupby(driver_col, sort=False):
         valid_idx = g[g['lap_time'].notna()].index
         
         if(len(valid_idx) <= 1) : continue
@@ -30,7 +30,7 @@ def compute_derived(df_raw):
     
     df_work['lap_time_best_on_tyre'] = False
 
-    df_work['stint_min_lap'] = df_work.groupby(['driver_name','stint_number'])['lap_time'].transform('min')
+    df_work['stint_min_lap'] = df_work.groupby([driver_col,'stint_number'])['lap_time'].transform('min')
     
     df_work.loc[
         (df_work['lap_time']==df_work['stint_min_lap']) &
@@ -59,4 +59,21 @@ def normalise(df, mapping=None):
         We do fillna in the end since if a value appears that's not in the mapping , its output is NaN, which we dont want, so
         to retain original values, we do fillna(df['compound'])
     '''
-    return df
\ No newline at end of file
+    return df
+
+
+
+def join_dimensions(tables):
+    '''
+        Rebuilds the wide one-row-per-lap frame (same columns as extract_rows_from_session) from the
+        laps fact table and the events / sessions / drivers dimension tables
+    '''
+    
+    df = tables['laps'].merge(tables['sessions'], on='session_id', how='left')
+    df = df.merge(tables['events'], on='event_id', how='left')
+    df = df.merge(tables['drivers'].drop(columns=['event_id']), on='driver_id', how='left')
+    
+    df['gp'] = df['round']
+    df = df.rename(columns={'laps_total' : 'laps_total_in_race'})
+    
+    return df.drop(columns=['session_id', 'event_id', 'driver_id', 'session_number', 'session_date'])